@@ -1,6 +1,62 @@
+import ast    #imports the abstract syntax tree module, used to parse literal values safely
 import json   #imports JSON modules
+import operator  #imports the function versions of Python's comparison operators
 import re     #imports the regular expression module
 
+try:
+    import orjson  #optional fast JSON library, used to parse command properties when installed
+except ImportError:
+    orjson = None
+
+
+# Parses a JSON object with orjson when it is installed and with the standard json module otherwise, 
+# always returning what json.loads would. orjson reads integers longer than 64 bits as floats and rejects NaN and Infinity,
+# so inputs containing long digit runs, or that orjson refuses, are handed to json.loads instead.
+if orjson is not None:
+    _RE_LONG_INT = re.compile(r"\d{19,}")
+
+    def _loads(s):
+        if _RE_LONG_INT.search(s):
+            return json.loads(s)
+        
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            return json.loads(s)
+
+else:
+    _loads = json.loads
+
+
+# Command and query patterns, compiled once at import time instead of on every parsed command.
+_RE_CREATE_NODE = re.compile(r"CREATE NODE (\w+) \{(.+?)\}")
+_RE_CREATE_REL = re.compile(r"CREATE RELATIONSHIP (\w+) FROM (\w+)\(id=(\d+)\) TO (\w+)\(id=(\d+)\) \{(.+?)\}")
+_RE_UPDATE_REL = re.compile(r"UPDATE RELATIONSHIP (\w+) FROM (\w+)\(id=(\d+)\) TO (\w+)\(id=(\d+)\) \{(.+?)\}")
+_RE_TRAVERSE = re.compile(r"TRAVERSE (\w+)\(id=(\d+)\)\s+(.*?)\s+WHERE\s+(.+)")
+_RE_PATTERN = re.compile(r"-\[(\w+)\]->\s+(\w+)|<-\[(\w+)\]-\s+(\w+)")
+_RE_CLAUSE = re.compile(r"(\w+)\.(\w+)\s*([<>=!]+)\s*(.+)")
+
+# Every command combined into a single pattern, so one match both recognises the command and captures its arguments. 
+# Each alternative is a named group, and that command's own captures are the groups numbered directly after it.
+# The last alternative only catches TRAVERSE commands the full pattern rejected, so they can be reported as invalid.
+_RE_COMMAND = re.compile("|".join([
+    f"(?P<create_node>{_RE_CREATE_NODE.pattern})",
+    f"(?P<create_relationship>{_RE_CREATE_REL.pattern})",
+    f"(?P<update_relationship>{_RE_UPDATE_REL.pattern})",
+    f"(?P<traverse>{_RE_TRAVERSE.pattern})",
+    "(?P<invalid_traverse>TRAVERSE)",
+]))
+
+# Comparison operators supported in WHERE clauses, mapped to the functions that implement them.
+_OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
 
 # It encapsulates the properties and type of a node,
 # provides a consistent way to identify and access nodes in the graph.
@@ -13,7 +69,10 @@ class Node:
 
 # It represents a directed, typed connection from one node to another,
 # stores metadata about that relationship (called properties)
+# from_node and to_node hold the ids of the connected nodes. __slots__ keeps each instance small, since graphs can hold many relationships.
 class Relationship:
+    __slots__ = ("type", "from_node", "to_node", "properties")
+
     def __init__(self, rel_type, from_node, to_node, properties):
         self.type = rel_type
         self.from_node = from_node
@@ -21,6 +80,18 @@ class Relationship:
         self.properties = properties
 
 
+    # Converts the relationship to the flat dict layout used in JSON exports and traversal results.
+    def to_dict(self):
+        return {"type": self.type, "from": self.from_node, "to": self.to_node, **self.properties}
+
+
+    # Builds a relationship from the flat dict layout produced by to_dict.
+    @classmethod
+    def from_dict(cls, data):
+        properties = dict(data)
+        return cls(properties.pop("type"), properties.pop("from"), properties.pop("to"), properties)
+
+
 # It handles the storage, creation, retrieval, modification, and 
 # traversal of the graph structure (nodes and relationships), entirely in memory.
 class Graph:
@@ -30,15 +101,64 @@ class Graph:
     def __init__(self):
         self.nodes = {} 
         self.relationships = []
+        self.node_index = {}
+        self.id_index = {}
+        self.type_order = {}
+        self.id_type_order = {}
+        self.out_adj = {}
+        self.in_adj = {}
+        self.rel_index = {}
 
 
     # Responsible for creating and adding a new node to the graph database
     def create_node(self, node_type, properties):
         if node_type not in self.nodes:
             self.nodes[node_type] = []
-        self.nodes[node_type].append({"type": node_type, **properties})
-        
-    
+        node = {"type": node_type, **properties}
+        self.nodes[node_type].append(node)
+        self._index_node(node_type, node)
+
+
+    # Registers a node in the lookup indexes so it can be found by (type, id) or by id alone in constant time.
+    # Lookups return the same node the original linear searches did: for (type, id) the first node of that type with the id,
+    # and for id alone the first one found scanning types in self.nodes order, then nodes in creation order.
+    # type_order records each type's position in self.nodes, and id_type_order the position of the type indexed for each id.
+    def _index_node(self, node_type, node):
+        node_id = node.get("id")
+        self.node_index.setdefault((node_type, node_id), node)
+
+        order = self.type_order.setdefault(node_type, len(self.type_order))
+        if order < self.id_type_order.get(node_id, len(self.type_order)):
+            self.id_index[node_id] = node
+            self.id_type_order[node_id] = order
+
+
+    # Registers a relationship in the adjacency indexes, bucketed by (node id, relationship type) for each direction,
+    # so neighbor lookups only touch the relationships attached to the node instead of scanning the whole graph.
+    # Also keys it by (type, from id, to id) for direct lookup on update; the first relationship with a given key wins.
+    def _index_relationship(self, rel):
+        self.out_adj.setdefault((rel.from_node, rel.type), []).append(rel)
+        self.in_adj.setdefault((rel.to_node, rel.type), []).append(rel)
+        self.rel_index.setdefault((rel.type, rel.from_node, rel.to_node), rel)
+
+
+    # Rebuilds every lookup index from the stored nodes and relationships, used after the graph is replaced wholesale.
+    def _rebuild_indexes(self):
+        self.node_index = {}
+        self.id_index = {}
+        self.type_order = {}
+        self.id_type_order = {}
+        self.out_adj = {}
+        self.in_adj = {}
+        self.rel_index = {}
+        for node_type, node_list in self.nodes.items():
+            for node in node_list:
+                self._index_node(node_type, node)
+
+        for rel in self.relationships:
+            self._index_relationship(rel)
+
+
     # Responsible for creating a relationship between two nodes in the graph. 
     # The relationship has a type, connects two specific nodes, and may have properties associated with it.
     def create_relationship(self, rel_type, from_type, from_id, to_type, to_id, properties):
@@ -46,65 +166,48 @@ class Graph:
         to_node = self.get_node(to_type, to_id)
         
         if from_node and to_node:
-            self.relationships.append({
-                "type": rel_type,
-                "from": from_id,
-                "to": to_id,
-                **properties
-           
-            })
+            rel = Relationship(rel_type, from_id, to_id, properties)
+            self.relationships.append(rel)
+            self._index_relationship(rel)
    
 
     # Used to retrieve a specific node from the graph by searching for it based on its type and unique identifier. 
     # Allows the user to query the graph for a node and obtain its properties or perform other operations.
     def get_node(self, node_type, node_id):
-        for node in self.nodes.get(node_type, []):
-            if node.get("id") == node_id:
-                return node
-        
-        return None
+        return self.node_index.get((node_type, node_id))
 
 
     # Used to retrieve a specific node from the graph based on its unique identifier. 
     # Searches for a node by its ID across all the nodes in the graph, regardless of its type.
     def get_node_by_id(self, id):
-        for node_list in self.nodes.values():
-            for node in node_list:
-                if node["id"] == id:
-                    return node
-        
-        return None
+        return self.id_index.get(id)
 
 
     # Retrieves the connected nodes (neighbors) of a given node in the graph based on certain relationship types and traversal direction. 
     # Used to perform traversal queries in the graph, helping to explore adjacent nodes connected by specific types of relationships.
     def get_neighbors(self, node, rel_type, direction):
-        results = []
-        for rel in self.relationships:
-            if rel["type"] != rel_type:
-                continue
-            
-            if direction == "out" and rel["from"] == node["id"]:
-                target_node = self.get_node_by_id(rel["to"])
-                results.append((rel, target_node))
-            
-            elif direction == "in" and rel["to"] == node["id"]:
-                source_node = self.get_node_by_id(rel["from"])
-                results.append((rel, source_node))
+        id_index = self.id_index
+        
+        if direction == "out":
+            return [(rel, id_index.get(rel.to_node)) for rel in self.out_adj.get((node["id"], rel_type), ())]
+        
+        elif direction == "in":
+            return [(rel, id_index.get(rel.from_node)) for rel in self.in_adj.get((node["id"], rel_type), ())]
         
-        return results
+        return []
 
 
     # Designed to update the properties of an existing relationship in the graph database. 
     # This method modifies the properties of a relationship between two nodes, specified by the relationship type (rel_type), 
     # the IDs of the two nodes (from_id and to_id), and the new properties to be applied.
+    # The relationship is found directly through the (type, from id, to id) index.
     def update_relationship_properties(self, rel_type, from_id, to_id, new_properties):
-        for rel in self.relationships:
-            if rel["type"] == rel_type and rel["from"] == from_id and rel["to"] == to_id:
-                rel.update(new_properties)
-                return True
+        rel = self.rel_index.get((rel_type, from_id, to_id))
+        if rel is None:
+            return False
 
-        return False
+        rel.properties.update(new_properties)
+        return True
 
 
     # Designed to export the current state of the graph database to a JSON file. 
@@ -112,70 +215,100 @@ class Graph:
     # stored, or imported back into the graph database at a later time.
     def export_to_json(self, filename):
         with open(filename, 'w') as f:
-            json.dump({"nodes": self.nodes, "relationships": self.relationships}, f, indent=2)
+            relationships = [rel.to_dict() for rel in self.relationships]
+            json.dump({"nodes": self.nodes, "relationships": relationships}, f, indent=2)
 
 
     # Designed to import graph data from a JSON file into the graph database. 
     # This allows you to load a previously exported graph from a JSON file and reconstruct the graph’s nodes and relationships, 
     # restoring the graph’s state in memory.
+    # Both sections are read before either is assigned, so a file missing one of them leaves the current graph untouched.
     def import_from_json(self, filename):
         with open(filename, 'r') as f:
             data = json.load(f)
-            self.nodes = data["nodes"]
-            self.relationships = data["relationships"]
+        
+        nodes = data["nodes"]
+        relationships = [Relationship.from_dict(rel) for rel in data["relationships"]]
+        self.nodes = nodes
+        self.relationships = relationships
+        self._rebuild_indexes()
 
 
     
 # It takes a user-entered command (like CREATE NODE Person {id: 1, name: "Alice"}),
 # figures out what the user wants to do, and then calls the appropriate function on the Graph object to perform the action.
 def command_parser(graph, command):
-    if command.startswith("CREATE NODE"):
-        match = re.match(r"CREATE NODE (\w+) \{(.+?)\}", command)
+    match = _RE_COMMAND.match(command)
+    if match:
+        _COMMAND_HANDLERS[match.lastgroup](graph, command, match.groups()[match.lastindex:])
+
+
+# Runs a sequence of commands against the graph, in order. 
+# Equivalent to calling command_parser for each one, with the pattern and handler lookups hoisted out of the loop for bulk loads.
+def command_parser_batch(graph, commands):
+    match_command = _RE_COMMAND.match
+    handlers = _COMMAND_HANDLERS
+    for command in commands:
+        match = match_command(command)
         if match:
-            node_type, props = match.groups()
-            props = json.loads("{" + props + "}")
-            graph.create_node(node_type, props)
-    
+            handlers[match.lastgroup](graph, command, match.groups()[match.lastindex:])
 
-    elif command.startswith("CREATE RELATIONSHIP"):
-        match = re.match(
-            r"CREATE RELATIONSHIP (\w+) FROM (\w+)\(id=(\d+)\) TO (\w+)\(id=(\d+)\) \{(.+?)\}",
-            command
-        )
 
-        if match:
-            rel_type, from_type, from_id, to_type, to_id, props = match.groups()
-            props = json.loads("{" + props + "}")
-            graph.create_relationship(rel_type, from_type, int(from_id), to_type, int(to_id), props)
-    
-   
-    elif command.startswith("UPDATE RELATIONSHIP"):
-        match = re.match(
-            r"UPDATE RELATIONSHIP (\w+) FROM (\w+)\(id=(\d+)\) TO (\w+)\(id=(\d+)\) \{(.+?)\}",
-            command
-        )
-       
-        if match:
-            rel_type, from_type, from_id, to_type, to_id, props = match.groups()
-            props = json.loads("{" + props + "}")
-            success = graph.update_relationship_properties(rel_type, int(from_id), int(to_id), props)  
-            if not success:
-                print("Relationship not found.")
-   
-    elif command.startswith("TRAVERSE"):
-        handle_traverse(graph, command)
+# Command handlers dispatched by command_parser. 
+# Each receives the graph, the raw command and the groups captured by the matched command, followed by unused trailing groups.
+def _run_create_node(graph, command, groups):
+    node_type, props = groups[:2]
+    graph.create_node(node_type, _loads("{" + props + "}"))
+
+
+def _run_create_relationship(graph, command, groups):
+    rel_type, from_type, from_id, to_type, to_id, props = groups[:6]
+    props = _loads("{" + props + "}")
+    graph.create_relationship(rel_type, from_type, int(from_id), to_type, int(to_id), props)
+
+
+def _run_update_relationship(graph, command, groups):
+    rel_type, from_type, from_id, to_type, to_id, props = groups[:6]
+    props = _loads("{" + props + "}")
+    success = graph.update_relationship_properties(rel_type, int(from_id), int(to_id), props)
+    if not success:
+        print("Relationship not found.")
+
+
+def _run_traverse(graph, command, groups):
+    start_type, start_id, pattern_str, where_clause = groups[:4]
+    run_traverse(graph, start_type, start_id, pattern_str, where_clause)
+
+
+def _run_invalid_traverse(graph, command, groups):
+    print("Invalid TRAVERSE syntax.")
+
+
+# Maps each named alternative of _RE_COMMAND to the handler that carries it out.
+_COMMAND_HANDLERS = {
+    "create_node": _run_create_node,
+    "create_relationship": _run_create_relationship,
+    "update_relationship": _run_update_relationship,
+    "traverse": _run_traverse,
+    "invalid_traverse": _run_invalid_traverse,
+}
 
 
 # Responsible for handling a TRAVERSE command within the graph database system. 
 # It interprets the command and performs the necessary graph traversal based on the command parameters.
 def handle_traverse(graph, command):
-    match = re.match(r"TRAVERSE (\w+)\(id=(\d+)\)\s+(.*?)\s+WHERE\s+(.+)", command)
+    match = _RE_TRAVERSE.match(command)
     
     if not match:
         print("Invalid TRAVERSE syntax.")
         return
 
-    start_type, start_id, pattern_str, where_clause = match.groups()
+    run_traverse(graph, *match.groups())
+
+
+# Performs the traversal for a TRAVERSE command whose parts have already been captured by _RE_TRAVERSE, 
+# printing every path that matches the pattern and the WHERE clause.
+def run_traverse(graph, start_type, start_id, pattern_str, where_clause):
     start_id = int(start_id)
 
     start_node = graph.get_node(start_type, start_id)
@@ -183,7 +316,7 @@ def handle_traverse(graph, command):
         print(f"Start node {start_type}({start_id}) not found.")
         return
 
-    pattern = re.findall(r"-\[(\w+)\]->\s+(\w+)|<-\[(\w+)\]-\s+(\w+)", pattern_str)
+    pattern = _RE_PATTERN.findall(pattern_str)
     steps = []
     for forward_rel, forward_type, backward_rel, backward_type in pattern:
         if forward_rel:
@@ -192,23 +325,80 @@ def handle_traverse(graph, command):
         else:
             steps.append(("in", backward_rel, backward_type))
 
+    compiled_where = compile_where(where_clause)
+    
+    # Every position in a matching path holds a node of a known type (the start type, then each step's type),
+    # so the conditions for each step are resolved once here rather than looked up per node.
+    step_predicates = [compiled_where.get(expected_type, ()) for _, _, expected_type in steps]
     results = []
 
-    def dfs(path, current_node, step_idx):
-        if step_idx >= len(steps):
-            if evaluate_filter_clause(where_clause, path):
+    # Returns the neighbors reached from node by the given step that have the expected type, as (rel, node, status) entries
+    # where status is the neighbor's check_node result. With deferred set every such neighbor is returned,
+    # otherwise only those that can still match (status True or None).
+    # When several paths reach the same node at the same step (through cycles or shared neighbors), the lookup
+    # and checks only happen the first time and the lists are reused afterwards from expansions.
+    expansions = {}
+
+    def expand(node, step_idx, deferred):
+        key = (node["id"], step_idx)
+        expansion = expansions.get(key)
+        if expansion is None:
+            direction, rel_type, expected_type = steps[step_idx]
+            predicates = step_predicates[step_idx]
+            candidates = [
+                (rel, next_node, check_node(next_node, predicates))
+                for rel, next_node in graph.get_neighbors(node, rel_type, direction)
+                if next_node["type"] == expected_type
+            ]
+            matches = [candidate for candidate in candidates if candidate[2] is not False]
+            expansion = expansions[key] = (matches, candidates)
+        
+        return expansion[1] if deferred else expansion[0]
+
+    # Depth-first search over the pattern steps, using an explicit stack instead of recursion.
+    # Each node is checked against the WHERE conditions once, when it is reached, and branches that fail are pruned,
+    # so every path that reaches the end of the pattern is already a match.
+    # A node whose conditions cannot be compared (check_node returns None) is not pruned, since a complete path through it
+    # must raise the comparison error, as a whole-path check would. From deferred_at, the position of that node, 
+    # down the search keeps every neighbor of the right type and re-checks completed paths with evaluate_filter_clause.
+    # A single path list is shared by the whole search: entries are appended when descending and popped when backtracking,
+    # and stack[i] iterates over the neighbors of the node at path[i].
+    path = [(None, start_node)]
+    stack = []
+    deferred_at = None
+    start_status = check_node(start_node, compiled_where.get(start_type, ()))
+    if start_status is not False:
+        if start_status is None:
+            deferred_at = 0
+        
+        if steps:
+            stack.append(iter(expand(start_node, 0, deferred_at is not None)))
+        elif deferred_at is None or evaluate_filter_clause(compiled_where, path):
+            results.append(format_path(path))
+    
+    while stack:
+        step = next(stack[-1], None)
+        if step is None:
+            stack.pop()
+            path.pop()
+            if deferred_at is not None and len(path) <= deferred_at:
+                deferred_at = None
+            continue
+
+        rel, node, status = step
+        path.append((rel, node))
+        if status is None and deferred_at is None:
+            deferred_at = len(path) - 1
+        
+        if len(path) > len(steps):
+            if deferred_at is None or evaluate_filter_clause(compiled_where, path):
                 results.append(format_path(path))
             
-            return
-
-        direction, rel_type, expected_type = steps[step_idx]
-        next_nodes = graph.get_neighbors(current_node, rel_type, direction)
-
-        for rel, next_node in next_nodes:
-            if next_node["type"] == expected_type:
-                dfs(path + [(rel, next_node)], next_node, step_idx + 1)
-
-    dfs([(None, start_node)], start_node, 0)
+            path.pop()
+            if deferred_at is not None and len(path) <= deferred_at:
+                deferred_at = None
+        else:
+            stack.append(iter(expand(node, len(path) - 1, deferred_at is not None)))
 
     print("Results:")
     
@@ -216,53 +406,71 @@ def handle_traverse(graph, command):
         print(json.dumps(result, indent=2))
 
 
+# Parses the conditions of a WHERE clause once per query, so the traversal does not re-split and re-parse them for every path. 
+# Returns the conditions grouped by the node type they apply to, as {type_name: [(prop, op_fn, value), ...]},
+# where op_fn is the comparison function already resolved from the operator string.
+def compile_where(where_clause):
+    compiled = {}
+    for clause in where_clause.split("AND"):
+        clause = clause.strip()
+        match = _RE_CLAUSE.match(clause)
+        
+        if not match:
+            continue
+        
+        type_name, prop, op, value = match.groups()
+        op_fn = _OPS.get(op, _unknown_op)
+        compiled.setdefault(type_name, []).append((prop, op_fn, ast.literal_eval(value)))
+    
+    return compiled
+
+
 # Responsible for evaluating the conditions specified in a WHERE clause of a graph query. 
 # This is part of the process where the graph database applies filtering logic to ensure that only the nodes and 
 # relationships that match the criteria in the WHERE clause are included in the result.
-def evaluate_filter_clause(where_clause, path):
+# Expects the WHERE clause already parsed by compile_where.
+def evaluate_filter_clause(compiled_where, path):
     for _, node in path:
-        for clause in where_clause.split("AND"):
-            clause = clause.strip()
-            match = re.match(r"(\w+)\.(\w+)\s*([<>=!]+)\s*(.+)", clause)
-            
-            if not match:
-                continue
-            
-            type_name, prop, op, value = match.groups()
-            value = eval(value)
-            if node["type"] == type_name:
-                actual = node.get(prop)
-                if not compare(actual, op, value):
-                    return False
+        if not node_matches(node, compiled_where.get(node["type"], ())):
+            return False
     return True
 
 
-# Designed to perform a comparison between two values, a and b, using a specified operator op. 
-# The function takes two operands (a and b) and an operator (op), and based on the operator, it returns the result of the comparison.
-def compare(a, op, b):
-    if op == "<":
-        return a < b
-    elif op == "<=":
-        return a <= b
-    elif op == ">":
-        return a > b
-    elif op == ">=":
-        return a >= b
-    elif op == "==":
-        return a == b
-    elif op == "!=":
-        return a != b
-    
+# Checks a single node against the conditions compiled for its type, stopping at the first one that fails.
+def node_matches(node, predicates):
+    for prop, op_fn, value in predicates:
+        if not op_fn(node.get(prop), value):
+            return False
+    return True
+
+
+# Checks a node like node_matches, but returns None instead of raising when one of its conditions cannot be compared
+# (for example a missing property under <), so the traversal can leave the error to the completed paths through it.
+def check_node(node, predicates):
+    try:
+        return node_matches(node, predicates)
+    except TypeError:
+        return None
+
+
+# Stands in for an unsupported operator, which never matches.
+def _unknown_op(a, b):
     return False
 
 
 # Designed to convert a traversal path (a list of nodes and relationships) into a readable, formatted string representation.
 def format_path(path):
-    nodes = [node for _, node in path]
-    rels = [rel for rel, _ in path if rel]
+    path_strs = []
+    nodes = []
+    rels = []
+    for rel, node in path:
+        path_strs.append(f"{node['type']}:{node['id']}")
+        nodes.append(node)
+        if rel is not None:
+            rels.append(rel.to_dict())
     
     return {
-        "path": [f"{node['type']}:{node['id']}" for node in nodes],
+        "path": path_strs,
         "nodes": nodes,
         "relationships": rels
     }